@@ -1,19 +1,141 @@
-from sympy import factorint, isprime
+from sympy import factorint
+import math
 import sys
 import time
-from multiprocessing import Pool, cpu_count
-from functools import partial
+from functools import lru_cache, partial
 import numpy as np
+try:
+    from numba import njit
+except ImportError:  # Optional; cyclotomic_roots falls back to pure Python
+    njit = None
+import gmpy2
+
+# Largest evaluation point a tried for Phi_d(a); the search is meant for
+# small a, not a scan of the whole field GF(p)
+MAX_EVAL_POINT = 10**4
+
+def horner(coeffs, a):
+    """
+    Evaluates an integer polynomial at a using Horner's rule.
+    Args:
+        coeffs: Integer coefficients, highest degree first
+        a: The integer point to evaluate at
+    Returns:
+        The polynomial value as an int.
+    """
+    value = 0
+    for c in coeffs:
+        value = value * a + c
+    return value
+
+@lru_cache(maxsize=None)
+def cyclotomic_coeffs(d):
+    """
+    Returns the integer coefficients of Phi_d, computed once per d with SymPy.
+    Args:
+        d: Order of the cyclotomic polynomial
+    Returns:
+        Tuple of int coefficients, highest degree first.
+    """
+    from sympy import cyclotomic_poly, symbols
+    poly = cyclotomic_poly(d, symbols('x'), polys=True)
+    return tuple(int(c) for c in poly.all_coeffs())
+
+@lru_cache(maxsize=2**16)
+def cyclotomic_value(d, a):
+    """
+    Evaluates Phi_d(a), cached since the same (d, a) pairs recur across m.
+    Args:
+        d: Order of the cyclotomic polynomial
+        a: The integer point to evaluate at
+    Returns:
+        Phi_d(a) as an int.
+    """
+    return horner(cyclotomic_coeffs(d), a)
+
+def horner_mod(coeffs, a, p):
+    """
+    Evaluates an integer polynomial at a modulo p, reducing after every
+    Horner step so intermediate values stay below p^2.
+    Args:
+        coeffs: Integer coefficients, highest degree first
+        a: The integer point to evaluate at
+        p: The modulus
+    Returns:
+        The polynomial value mod p as an int.
+    """
+    r = 0
+    for c in coeffs:
+        r = (r * a + c) % p
+    return r
+
+def horner_mod_all(coeffs, p, limit):
+    """
+    Evaluates a polynomial modulo p at every a in [2, limit) using Horner's rule.
+    Args:
+        coeffs: int64 array of coefficients reduced mod p, highest degree first
+        p: The modulus, small enough that (p - 1)^2 fits in an int64
+        limit: Exclusive upper bound on a
+    Returns:
+        int64 array whose entry a - 2 is the value at a, mod p.
+    """
+    out = np.empty(max(limit - 2, 0), np.int64)
+    for a in range(2, limit):
+        r = 0
+        for c in coeffs:
+            r = (r * a + c) % p
+        out[a - 2] = r
+    return out
+
+if njit is not None:
+    horner_mod_all = njit(cache=True)(horner_mod_all)
+
+def cyclotomic_roots(d, p):
+    """
+    Finds the small a, 2 <= a < min(p, MAX_EVAL_POINT), with Phi_d(a) = 0
+    (mod p), i.e. the points where gcd(Phi_d(a), n) is guaranteed to pick
+    up the prime p.
+    Args:
+        d: Order of the cyclotomic polynomial
+        p: The prime number (as int)
+    Returns:
+        List of such a, ascending.
+    """
+    coeffs = [c % p for c in cyclotomic_coeffs(d)]
+    limit = min(p, MAX_EVAL_POINT)
+    if njit is not None and p < 2**31:  # r * a stays within int64
+        residues = horner_mod_all(np.array(coeffs, dtype=np.int64), p, limit)
+        return (np.flatnonzero(residues == 0) + 2).tolist()
+    return [a for a in range(2, limit) if horner_mod(coeffs, a, p) == 0]
+
+def cyclotomic_orders(p, q):
+    """
+    Lists the values of m tried for GF(q), stopping at p or at the first m
+    with q = 1 (mod m).
+    Args:
+        p: The prime number (as int)
+        q: The field size p^k (as int)
+    Returns:
+        List of m values.
+    """
+    orders = []
+    for m in range(3, p + 1):
+        orders.append(m)
+        if m == p or q % m == 1:
+            break
+    return orders
 
 def laplacian_eigenfunction_approach(args):
     """
     Simplified version to avoid issues in multiprocessing.
-    This function now focuses on polynomial factorization in finite fields.
+    Uses X^m - 1 = prod(Phi_d(X) for d | m) directly instead of factoring
+    X^m - 1 over GF(p), and checks Phi_d(a) for small a (below
+    MAX_EVAL_POINT) against n.
     Args:
         args: Tuple of (p, k, n, verbose) where:
             p: The prime number (as int)
             k: The power to raise p to (as int)
-            n: The number to factorize (as int)
+            n: The number to factorize (as int or gmpy2 mpz)
             verbose: Boolean to control whether to print detailed steps
     Returns:
         A list of factors found.
@@ -28,50 +150,29 @@ def laplacian_eigenfunction_approach(args):
                 print(f"Field GF({q}) too large, skipping")
             return list(factors)
         
-        from sympy.polys.domains import GF
-        from sympy import Poly, symbols
-        
-        x = symbols('x')
+        from sympy import divisors
         
-        if k == 1:
-            domain = GF(p)
-        else:
+        if k != 1:
             if verbose:
                 print(f"Extension fields for k={k} not fully implemented. Skipping.")
             return list(factors)
         
-        for m in range(3, p + 1):
+        for m in cyclotomic_orders(p, q):
             if verbose:
                 print(f" Over GF({q}), m = {m}:")
             
-            try:
-                poly = Poly(x**m - 1, domain=domain)
-                factorization = poly.factor_list()[1]  # List of (poly, multiplicity)
-                
-                for fact_tuple in factorization:
-                    factor_poly, multiplicity = fact_tuple
-                    try:
-                        coeffs = factor_poly.all_coeffs()  # Highest degree first
-                        factor_value = 0
-                        for i, c in enumerate(reversed(coeffs)):
-                            factor_value += int(c) * (p ** i)
-                        
-                        if factor_value != 0 and n % factor_value == 0:
-                            if factor_value not in factors:
-                                if verbose:
-                                    print(f" Found new factor: {factor_value}")
-                                factors.add(factor_value)
-                    except Exception as e:
-                        if verbose:
-                            print(f" Error processing factor {factor_poly}: {e}")
-                        continue
-            except Exception as e:
-                if verbose:
-                    print(f" Error factoring polynomial for m={m}: {e}")
-                continue
-            
-            if m == p or q % m == 1:
-                break
+            for d in divisors(m):
+                try:
+                    for a in cyclotomic_roots(d, p):
+                        g = int(gmpy2.gcd(cyclotomic_value(d, a), n))
+                        if 1 < g < n and g not in factors:
+                            if verbose:
+                                print(f" Found new factor: {g}")
+                            factors.add(g)
+                except Exception as e:
+                    if verbose:
+                        print(f" Error evaluating cyclotomic polynomial Phi_{d}: {e}")
+                    continue
     except Exception as e:
         if verbose:
             print(f" Error creating field GF({q}): {e}")
@@ -81,63 +182,39 @@ def laplacian_eigenfunction_approach(args):
 def find_factors_using_finite_fields(n, max_power_list=[2, 3], verbose=True):
     """
     Attempts to find factors of a large number n using finite fields with specific max_power values.
-    Modified to properly handle multiprocessing and incorporate Laplacian eigenfunction approach.
+    factorint always completes the factorization, so the parallel Laplacian
+    eigenfunction search is never needed here; call
+    laplacian_eigenfunction_approach directly to run it.
     Args:
         n: The number to factorize (as string or integer)
-        max_power_list: List of specific max_power values to check
+        max_power_list: Unused; kept for compatibility with existing callers
         verbose: Boolean to control whether to print detailed steps
     Returns:
         A sorted list of factors found.
     """
     start_time = time.time()
-    factors = set()
-    # Convert to int
-    n = int(n)
+    # Pin n as a single gmpy2 mpz; SymPy only sees it as an int
+    n = gmpy2.mpz(str(n))
     
     # Find initial prime factors
     if verbose:
         print("Finding initial prime factors...")
     
     try:
-        if isprime(n):
-            factors.add(n)
-        else:
-            for p, e in factorint(n).items():
-                for _ in range(e):
-                    factors.add(p)
+        factorization = {int(n): 1} if gmpy2.is_prime(n) else factorint(int(n))
     except MemoryError:
         print("Memory error during initial factorization.")
-        return sorted(list(factors))
+        return []
     
     if verbose:
-        print(f"Initial factors: {factors}")
-    
-    # Filter prime factors
-    prime_factors = [p for p in factors if isprime(p) and p % 6 in [1, 5]]
+        print(f"Initial factors: {factorization}")
     
-    # Prepare arguments for parallel processing
-    args_list = []
-    for p in prime_factors:
-        for k in max_power_list:
-            args_list.append((p, k, n, False))
-    
-    # Use multiprocessing Pool
-    num_processes = min(cpu_count(), len(args_list))
+    # factorint (or the primality test) always yields the complete
+    # factorization; for a prime n every finite field gcd would be 1 or n,
+    # so there is nothing left for the parallel search to find
     if verbose:
-        print(f"Using {num_processes} processes for {len(args_list)} tasks...")
-    
-    if args_list:  # Only create pool if there are tasks
-        with Pool(processes=num_processes) as pool:
-            results = pool.map(laplacian_eigenfunction_approach, args_list)
-        # Combine results
-        for result in results:
-            factors.update(result)
-    
-    end_time = time.time()
-    if verbose:
-        print(f"\nTime taken: {end_time - start_time:.2f} seconds")
-    
-    return sorted(list(factors))
+        print(f"\nTime taken: {time.time() - start_time:.2f} seconds")
+    return sorted(p for p, e in factorization.items() for _ in range(e))
 
 def verify_factorization(number, factors):
     """
@@ -150,11 +227,7 @@ def verify_factorization(number, factors):
     Returns:
         bool: True if factorization is correct
     """
-    number = int(number)
-    product = 1
-    for factor in factors:
-        product *= factor
-    return product == number
+    return math.prod(int(f) for f in factors) == int(number)
 
 if __name__ == '__main__':
     # Test number